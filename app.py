@@ -1,5 +1,5 @@
 import streamlit as st
-from deal_manager import DealManager, enhanced_deal_interface
+from deal_manager import deal_management_interface
 
 # Page config
 st.set_page_config(
@@ -36,4 +36,4 @@ st.markdown("""
 
 # Run the main interface
 if __name__ == "__main__":
-    enhanced_deal_interface()
+    deal_management_interface()
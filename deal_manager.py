@@ -3,68 +3,347 @@
 
 import streamlit as st
 import pandas as pd
-from datetime import datetime, timedelta
-import requests
+from datetime import datetime
+import asyncio
+import httpx
+import math
+import ahocorasick
 from bs4 import BeautifulSoup
-import json
+from selectolax.parser import HTMLParser
+from sortedcontainers import SortedKeyList
+import orjson
 import schedule
+import sqlite3
+import threading
 import time
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+import uuid
 import re
 
+# Retailer-specific price selectors
+_PRICE_SELECTORS = {
+    'zalando': [
+        '[data-testid="product-price"]',
+        '.ui-text-price',
+        'span[class*="price"]'
+    ],
+    'tommy_hilfiger': [
+        '.product-price',
+        '.price-current',
+        '[data-testid="price"]'
+    ],
+    'bijenkorf': [
+        '.product-price',
+        '.price',
+        '[class*="price"]'
+    ],
+    'generic': [
+        '[class*="price"]',
+        '[id*="price"]',
+        '.price',
+        'span[class*="amount"]'
+    ]
+}
+
+_PRICE_RE = re.compile(r'\d+(?:\.\d+)?')
+
+# Common "out of stock" indicators, matched against the lowercased page
+_OUT_OF_STOCK_INDICATORS = [
+    'out of stock',
+    'niet beschikbaar',
+    'uitverkocht',
+    'temporarily unavailable',
+    'product not available',
+    'sold out'
+]
+
+def _build_out_of_stock_automaton() -> ahocorasick.Automaton:
+    """Build a single-pass matcher for all out-of-stock indicators"""
+    automaton = ahocorasick.Automaton()
+    for indicator in _OUT_OF_STOCK_INDICATORS:
+        automaton.add_word(indicator, indicator)
+    automaton.make_automaton()
+    return automaton
+
+# Structured product data, usually emitted near the top of the page
+_JSONLD_RE = re.compile(
+    r'<script[^>]*application/ld\+json[^>]*>(.*?)</script>', re.DOTALL | re.IGNORECASE
+)
+
+# Used to find where an unfinished <script> block starts in a partial body
+_SCRIPT_OPEN_RE = re.compile(r'<script', re.IGNORECASE)
+_SCRIPT_CLOSE_RE = re.compile(r'</script>', re.IGNORECASE)
+_JSONLD_TYPE_RE = re.compile(r'application/ld\+json', re.IGNORECASE)
+
+# schema.org ItemAvailability values that mean the product can't be bought
+_UNAVAILABLE_STATES = {'OutOfStock', 'SoldOut', 'Discontinued'}
+
+def _priced_offer(offers: Any) -> Optional[Dict]:
+    """First offer carrying a price from a JSON-LD offers value (dict or list)"""
+    for offer in offers if isinstance(offers, list) else [offers]:
+        if isinstance(offer, dict) and (offer.get('price') or offer.get('lowPrice')):
+            return offer
+    return None
+
+def _find_offer(node: Any) -> Optional[Dict]:
+    """Depth-first search of a JSON-LD document for the first priced offer"""
+    if isinstance(node, list):
+        for item in node:
+            offer = _find_offer(item)
+            if offer is not None:
+                return offer
+    elif isinstance(node, dict):
+        offer = _priced_offer(node.get('offers'))
+        if offer is not None:
+            return offer
+        if '@graph' in node:
+            return _find_offer(node['@graph'])
+    return None
+
+# Retailer names as entered in the UI, mapped to the keys used by _PRICE_SELECTORS
+_RETAILER_KEYS = {
+    'tommy hilfiger': 'tommy_hilfiger',
+    'de bijenkorf': 'bijenkorf',
+}
+
+def _retailer_key(retailer: str) -> str:
+    """Normalize a retailer name to its price selector key"""
+    retailer = retailer.lower()
+    return _RETAILER_KEYS.get(retailer, retailer)
+
+def _jsonld_offer(block: str) -> Optional[Tuple[float, Optional[bool]]]:
+    """Read price and availability (None if not stated) from one JSON-LD block"""
+    try:
+        offer = _find_offer(orjson.loads(block))
+        if offer is None:
+            return None
+        price = float(offer.get('price') or offer.get('lowPrice'))
+    except (ValueError, TypeError):
+        return None
+    
+    availability = offer.get('availability')
+    if not isinstance(availability, str):
+        return price, None
+    return price, availability.rsplit('/', 1)[-1] not in _UNAVAILABLE_STATES
+
+@st.cache_resource
+def _get_connection(db_file: str) -> sqlite3.Connection:
+    """Open the deals database once per process so Streamlit reruns reuse it"""
+    conn = sqlite3.connect(db_file, check_same_thread=False)
+    # Write-ahead logging, keeping the default synchronous=FULL so every
+    # commit is atomic and fsync'd before it returns
+    conn.execute("PRAGMA journal_mode=WAL")
+    with conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS deals (
+                id TEXT PRIMARY KEY,
+                data JSON,
+                status TEXT,
+                discount REAL,
+                added_date TEXT,
+                last_checked TEXT
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_deals_status ON deals(status)")
+    return conn
+
+# Pre-sorted deal indices: sort key, and whether reads walk the index in reverse
+_SORT_INDICES = {
+    'discount_percentage': (lambda d: d.get('discount_percentage') or 0, True),
+    'added_date': (lambda d: d.get('added_date', ''), True),
+    'price': (lambda d: d.get('current_price', 0), False),
+}
+
+# Fields a deal can't be added without
+_REQUIRED_DEAL_FIELDS = ['product_name', 'brand', 'retailer', 'current_price', 'product_url']
+
 class DealManager:
     """Manages manually curated deals with automated price checking"""
     
+    # Shared across instances so the automaton is only built once per process
+    _out_of_stock_automaton = _build_out_of_stock_automaton()
+    
     def __init__(self):
-        self.deals_file = "curated_deals.json"
+        self.db_file = "deals.db"
+        self.deals_file = "curated_deals.json"  # Legacy store, imported once
+        self.conn = _get_connection(self.db_file)
         self.deals = self.load_deals()
-        self.session = requests.Session()
-        self.session.headers.update({
+        self._by_id: Dict[str, Dict] = {d['id']: d for d in self.deals}
+        self._sorted_indices = {
+            name: SortedKeyList(self.deals, key=key) for name, (key, _) in _SORT_INDICES.items()
+        }
+        self._unsaved: List[Dict] = []
+        self._unsaved_removals: List[str] = []
+        # Bumped on every change to the catalog; used as a cache key by the UI
+        self.version = 0
+        self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        }
+        # Shared by every Streamlit session via get_deal_manager, so guard state changes
+        self._lock = threading.RLock()
+        # Scrape results per URL, reused until they are older than cache_ttl
+        self.cache_ttl = 15 * 60  # seconds
+        # (monotonic time, wall-clock time, price, available) of each fetch
+        self._page_cache: Dict[str, Tuple[float, float, Optional[float], bool]] = {}
     
     def load_deals(self) -> List[Dict]:
         """Load manually curated deals"""
-        try:
-            with open(self.deals_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return []
-    
-    def save_deals(self):
-        """Save deals to file"""
-        with open(self.deals_file, 'w', encoding='utf-8') as f:
-            json.dump(self.deals, f, indent=2, ensure_ascii=False, default=str)
-    
-    def add_manual_deal(self, deal_data: Dict):
-        """Add a manually found deal"""
-        deal = {
-            'id': f"{deal_data['retailer']}_{len(self.deals)}_{int(time.time())}",
-            'product_name': deal_data['product_name'],
-            'brand': deal_data['brand'],
-            'retailer': deal_data['retailer'],
-            'current_price': deal_data['current_price'],
-            'original_price': deal_data.get('original_price'),
-            'product_url': deal_data['product_url'],
-            'image_url': deal_data.get('image_url', ''),
-            'sizes_available': deal_data.get('sizes_available', []),
-            'category': deal_data.get('category', 'Fashion'),
-            'gender': deal_data.get('gender', 'Unisex'),
-            'manually_added': True,
-            'added_date': datetime.now().isoformat(),
-            'last_checked': datetime.now().isoformat(),
-            'status': 'active',
-            'notes': deal_data.get('notes', ''),
-            'affiliate_link': deal_data.get('affiliate_link', ''),
-            'discount_percentage': self.calculate_discount(
-                deal_data.get('original_price'), 
-                deal_data['current_price']
+        rows = self.conn.execute("SELECT data FROM deals ORDER BY rowid").fetchall()
+        deals = [orjson.loads(data) for (data,) in rows]
+        
+        # user_version records that the old JSON catalog has been carried over,
+        # so deals removed later are not imported again on the next start
+        (schema_version,) = self.conn.execute("PRAGMA user_version").fetchone()
+        if schema_version < 1:
+            if not deals:
+                try:
+                    with open(self.deals_file, 'rb') as f:
+                        deals = orjson.loads(f.read())
+                except FileNotFoundError:
+                    pass
+                else:
+                    self.save_deals(deals)
+            with self.conn:
+                self.conn.execute("PRAGMA user_version = 1")
+        
+        # Older records only carry the ISO string; convert it once here
+        for deal in deals:
+            if 'last_checked_ts' not in deal:
+                try:
+                    deal['last_checked_ts'] = datetime.fromisoformat(deal['last_checked']).timestamp()
+                except (KeyError, TypeError, ValueError):
+                    deal['last_checked_ts'] = 0.0  # If no last_checked, consider stale
+        return deals
+    
+    def save_deals(self, deals: Optional[List[Dict]] = None):
+        """Upsert the given deals (all deals by default) in one transaction"""
+        if deals is None:
+            deals = self.deals
+        
+        rows = [
+            (
+                d['id'],
+                orjson.dumps(d, option=orjson.OPT_SERIALIZE_NUMPY).decode(),
+                d.get('status'),
+                d.get('discount_percentage'),
+                d.get('added_date'),
+                d.get('last_checked')
             )
-        }
+            for d in deals
+        ]
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO deals (id, data, status, discount, added_date, last_checked)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    data = excluded.data,
+                    status = excluded.status,
+                    discount = excluded.discount,
+                    added_date = excluded.added_date,
+                    last_checked = excluded.last_checked
+            """, rows)
+    
+    def add_manual_deal(self, deal_data: Dict, flush: bool = True):
+        """Add a manually found deal.
+        
+        With flush=False the deal is only written on the next flush(), so bulk
+        imports can persist everything in one transaction. Raises ValueError
+        for incomplete or malformed deal data, before anything is changed.
+        """
+        current_price, original_price = self._validate_deal_data(deal_data)
+        
+        with self._lock:
+            deal = {
+                # len(self.deals) repeats after a removal, so ids get a random suffix
+                'id': f"{deal_data['retailer']}_{int(time.time())}_{uuid.uuid4().hex}",
+                'product_name': deal_data['product_name'],
+                'brand': deal_data['brand'],
+                'retailer': deal_data['retailer'],
+                'current_price': current_price,
+                'original_price': original_price,
+                'product_url': deal_data['product_url'],
+                'image_url': deal_data.get('image_url', ''),
+                'sizes_available': deal_data.get('sizes_available', []),
+                'category': deal_data.get('category', 'Fashion'),
+                'gender': deal_data.get('gender', 'Unisex'),
+                'manually_added': True,
+                'added_date': datetime.now().isoformat(),
+                'last_checked': datetime.now().isoformat(),
+                'last_checked_ts': time.time(),
+                'status': 'active',
+                'notes': deal_data.get('notes', ''),
+                'affiliate_link': deal_data.get('affiliate_link', ''),
+                'discount_percentage': self.calculate_discount(original_price, current_price)
+            }
+            
+            self.deals.append(deal)
+            self._by_id[deal['id']] = deal
+            self._index(deal)
+            self._unsaved.append(deal)
+            if flush:
+                self.flush()
+            self.version += 1
+            return deal['id']
+    
+    def _validate_deal_data(self, deal_data: Dict) -> Tuple[float, Optional[float]]:
+        """Check required fields and return (current_price, original_price) as floats"""
+        if not isinstance(deal_data, dict):
+            raise ValueError("Each deal must be a JSON object")
+        
+        missing = [field for field in _REQUIRED_DEAL_FIELDS
+                   if deal_data.get(field) is None or deal_data.get(field) == '']
+        if missing:
+            raise ValueError(f"Missing required fields: {', '.join(missing)}")
+        not_text = [field for field in _REQUIRED_DEAL_FIELDS
+                    if field != 'current_price' and not isinstance(deal_data[field], str)]
+        if not_text:
+            raise ValueError(f"Fields must be text: {', '.join(not_text)}")
         
-        self.deals.append(deal)
-        self.save_deals()
-        return deal['id']
+        current_price = self._parse_price(deal_data['current_price'], 'current_price')
+        original_price = deal_data.get('original_price')
+        if original_price is not None and original_price != '':
+            original_price = self._parse_price(original_price, 'original_price')
+        else:
+            original_price = None
+        return current_price, original_price
+    
+    def _parse_price(self, value: Any, field: str) -> float:
+        """Convert a price to a positive finite float, raising ValueError otherwise"""
+        # bool is an int subclass, so float(True) would quietly give 1.0
+        if isinstance(value, bool):
+            raise ValueError(f"Invalid {field}: must be a number")
+        try:
+            price = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid {field}: must be a number")
+        if not math.isfinite(price) or price <= 0:
+            raise ValueError(f"Invalid {field}: must be greater than 0")
+        return price
+    
+    def flush(self):
+        """Write deals added or removed with flush=False"""
+        with self._lock:
+            if self._unsaved:
+                self.save_deals(self._unsaved)
+                self._unsaved = []
+            if self._unsaved_removals:
+                with self.conn:
+                    self.conn.executemany(
+                        "DELETE FROM deals WHERE id = ?",
+                        [(deal_id,) for deal_id in self._unsaved_removals]
+                    )
+                self._unsaved_removals = []
+    
+    def _index(self, deal: Dict):
+        """Add a deal to every pre-sorted index"""
+        for index in self._sorted_indices.values():
+            index.add(deal)
+    
+    def _unindex(self, deal: Dict):
+        """Remove a deal from every pre-sorted index"""
+        for index in self._sorted_indices.values():
+            index.discard(deal)
     
     def calculate_discount(self, original_price: Optional[float], current_price: float) -> Optional[float]:
         """Calculate discount percentage"""
@@ -72,172 +351,321 @@ class DealManager:
             return round(((original_price - current_price) / original_price) * 100, 1)
         return None
     
-    def extract_price_from_url(self, url: str, retailer: str) -> Optional[float]:
-        """Extract current price from product URL"""
+    async def _fetch(self, session: httpx.AsyncClient, semaphores: Dict[str, asyncio.Semaphore], url: str,
+                     headers: Optional[Dict[str, str]] = None,
+                     stop: Optional[Callable[[str], bool]] = None) -> Tuple[int, str, Dict[str, str]]:
+        """Fetch a page, throttling concurrent requests per host.
+        
+        The body is streamed; if stop returns True for the text received so
+        far, the rest of the page is not downloaded. Returns the status, the
+        (possibly partial) body and any cache validators the server sent.
+        """
+        host = urlparse(url).netloc
+        semaphore = semaphores.setdefault(host, asyncio.Semaphore(2))
+        async with semaphore:
+            async with session.stream('GET', url, headers=headers) as response:
+                validators = {}
+                if response.headers.get('ETag'):
+                    validators['etag'] = response.headers['ETag']
+                if response.headers.get('Last-Modified'):
+                    validators['last_modified'] = response.headers['Last-Modified']
+                
+                content = ''
+                async for text in response.aiter_text(64 * 1024):
+                    content += text
+                    if stop is not None and stop(content):
+                        break
+            await asyncio.sleep(1)  # Be respectful with requests
+            return response.status_code, content, validators
+    
+    def extract_price(self, content: str, retailer: str) -> Optional[float]:
+        """Extract current price from product page HTML"""
+        selectors = _PRICE_SELECTORS.get(_retailer_key(retailer), _PRICE_SELECTORS['generic'])
+        
+        # Parse once, then try selectors in priority order against the same tree
         try:
-            response = self.session.get(url, timeout=10)
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Retailer-specific price selectors
-            price_selectors = {
-                'zalando': [
-                    '[data-testid="product-price"]',
-                    '.ui-text-price',
-                    'span[class*="price"]'
-                ],
-                'tommy_hilfiger': [
-                    '.product-price',
-                    '.price-current',
-                    '[data-testid="price"]'
-                ],
-                'bijenkorf': [
-                    '.product-price',
-                    '.price',
-                    '[class*="price"]'
-                ],
-                'generic': [
-                    '[class*="price"]',
-                    '[id*="price"]',
-                    '.price',
-                    'span[class*="amount"]'
-                ]
-            }
+            tree = HTMLParser(content)
             
-            selectors = price_selectors.get(retailer.lower(), price_selectors['generic'])
-            
-            for selector in selectors:
-                price_elem = soup.select_one(selector)
-                if price_elem:
-                    price_text = price_elem.get_text(strip=True)
-                    # Extract numeric price
-                    price_match = re.search(r'[\d,]+\.?\d*', price_text.replace(',', ''))
-                    if price_match:
-                        return float(price_match.group())
+            def first_text(selector: str) -> Optional[str]:
+                node = tree.css_first(selector)
+                return node.text(strip=True) if node is not None else None
+        except Exception:
+            # Fall back to the pure-Python parser if lexbor chokes on the page
+            soup = BeautifulSoup(content, 'html.parser')
             
-            return None
+            def first_text(selector: str) -> Optional[str]:
+                elem = soup.select_one(selector)
+                return elem.get_text(strip=True) if elem is not None else None
+        
+        for selector in selectors:
+            price_text = first_text(selector)
+            if price_text:
+                # Extract numeric price
+                price_match = _PRICE_RE.search(price_text.replace(',', ''))
+                if price_match:
+                    return float(price_match.group())
+        
+        return None
+    
+    async def _fetch_and_parse(self, session: httpx.AsyncClient, semaphores: Dict[str, asyncio.Semaphore], deal: Dict,
+                               force: bool = False) -> Tuple[Optional[float], bool, Dict[str, Any]]:
+        """Fetch a product page once and read both price and availability from it.
+        
+        Sends the deal's stored ETag/Last-Modified so unchanged pages come back
+        as 304 and skip parsing. Also returns fields to store on the deal: fresh
+        validators plus page_available, the availability parsed from that page,
+        which a later 304 reuses; or, for a cache hit, the time of the cached fetch.
+        """
+        url = deal['product_url']
+        if not force:
+            cached = self._page_cache.get(url)
+            if cached and time.monotonic() - cached[0] < self.cache_ttl:
+                # Nothing was fetched now, so keep the time of the fetch that was cached
+                checked_ts = cached[1]
+                return cached[2], cached[3], {
+                    'last_checked': datetime.fromtimestamp(checked_ts).isoformat(),
+                    'last_checked_ts': checked_ts
+                }
+        
+        # Validators are only usable once a 200 page for them has been parsed
+        headers = {}
+        if 'page_available' in deal:
+            if deal.get('etag'):
+                headers['If-None-Match'] = deal['etag']
+            if deal.get('last_modified'):
+                headers['If-Modified-Since'] = deal['last_modified']
+        
+        # Scan JSON-LD blocks as they stream in; once one gives both price and
+        # availability there is no need to download the rest of the page
+        offer = None
+        scanned = 0
+        
+        def found_offer(text: str) -> bool:
+            nonlocal offer, scanned
+            for match in _JSONLD_RE.finditer(text, scanned):
+                scanned = match.end()
+                block_offer = _jsonld_offer(match.group(1))
+                if block_offer is None:
+                    continue
+                if offer is None:
+                    offer = block_offer
+                elif offer[1] is None and block_offer[1] is not None:
+                    # The first priced block wins; later blocks only fill in availability
+                    offer = (offer[0], block_offer[1])
             
+            # Move past text that can't start a block still being received, so
+            # the next chunk only rescans from an open JSON-LD tag or the tail
+            last_open = None
+            for last_open in _SCRIPT_OPEN_RE.finditer(text, scanned):
+                pass
+            if last_open is not None and not _SCRIPT_CLOSE_RE.search(text, last_open.end()):
+                tag_end = text.find('>', last_open.end())
+                if tag_end == -1 or _JSONLD_TYPE_RE.search(text, last_open.end(), tag_end):
+                    scanned = last_open.start()
+                    return offer is not None and offer[1] is not None
+            # A partial "<script" may sit at the very end of the text
+            scanned = max(scanned, len(text) - len('<script'))
+            return offer is not None and offer[1] is not None
+        
+        try:
+            status, content, validators = await self._fetch(session, semaphores, url, headers, stop=found_offer)
         except Exception as e:
             st.warning(f"Error checking price for {url}: {str(e)}")
-            return None
-    
-    def check_availability(self, url: str, retailer: str) -> bool:
-        """Check if product is still available"""
-        try:
-            response = self.session.get(url, timeout=10)
-            
-            # Check for common "out of stock" indicators
-            out_of_stock_indicators = [
-                'out of stock',
-                'niet beschikbaar',
-                'uitverkocht',
-                'temporarily unavailable',
-                'product not available',
-                'sold out'
-            ]
-            
-            content = response.text.lower()
-            for indicator in out_of_stock_indicators:
-                if indicator in content:
-                    return False
-            
+            return None, False, {}
+        
+        if status == 304:
+            # Page unchanged since it was last parsed; status may since have
+            # been set by a failed fetch, so use the availability from that page
+            current_price = deal['current_price']
+            is_available = deal['page_available']
+            self._page_cache[url] = (time.monotonic(), time.time(), current_price, is_available)
+            return current_price, is_available, {}
+        
+        if offer is not None:
+            current_price = offer[0]
+        else:
+            try:
+                current_price = self.extract_price(content, deal['retailer'])
+            except Exception as e:
+                st.warning(f"Error checking price for {url}: {str(e)}")
+                current_price = None
+        
+        if offer is not None and offer[1] is not None:
+            is_available = offer[1] and status == 200
+        # Check for common "out of stock" indicators
+        elif next(self._out_of_stock_automaton.iter(content.lower()), None) is not None:
+            is_available = False
+        else:
             # If we can fetch the page and no out-of-stock indicators, assume available
-            return response.status_code == 200
-            
-        except Exception:
-            return False
+            is_available = status == 200
+        
+        if status != 200:
+            return current_price, is_available, {}
+        
+        self._page_cache[url] = (time.monotonic(), time.time(), current_price, is_available)
+        # Replace any validators left over from an older version of the page
+        page_fields = {'etag': None, 'last_modified': None, **validators, 'page_available': is_available}
+        return current_price, is_available, page_fields
     
-    def refresh_deal_prices(self, deal_ids: List[str] = None) -> Dict[str, str]:
-        """Refresh prices for specified deals or all deals"""
-        if deal_ids is None:
-            deals_to_refresh = self.deals
-        else:
-            deals_to_refresh = [d for d in self.deals if d['id'] in deal_ids]
+    async def _refresh_one(self, session: httpx.AsyncClient, semaphores: Dict[str, asyncio.Semaphore], deal: Dict,
+                           force: bool = False) -> Tuple[Optional[float], bool, Dict[str, Any]]:
+        """Fetch current price and availability for a single deal"""
+        st.info(f"Checking: {deal['product_name']} at {deal['retailer']}")
+        
+        return await self._fetch_and_parse(session, semaphores, deal, force)
+    
+    async def refresh_deal_prices(self, deal_ids: List[str] = None, force: bool = False) -> Dict[str, str]:
+        """Refresh prices for specified deals or all deals.
+        
+        Pages scraped within the last cache_ttl seconds are not fetched again
+        unless force is set.
+        """
+        with self._lock:
+            if deal_ids is None:
+                deals_to_refresh = list(self.deals)
+            else:
+                deals_to_refresh = [self._by_id[i] for i in deal_ids if i in self._by_id]
         
         refresh_results = {}
+        # Semaphores are bound to this run's event loop, so each run gets its own
+        host_semaphores: Dict[str, asyncio.Semaphore] = {}
         
-        for deal in deals_to_refresh:
-            st.info(f"Checking: {deal['product_name']} at {deal['retailer']}")
-            
-            # Check current price
-            current_price = self.extract_price_from_url(deal['product_url'], deal['retailer'])
-            
-            # Check availability
-            is_available = self.check_availability(deal['product_url'], deal['retailer'])
-            
-            # Update deal data
-            old_price = deal['current_price']
-            deal['last_checked'] = datetime.now().isoformat()
-            
-            if current_price is not None:
-                deal['current_price'] = current_price
-                deal['discount_percentage'] = self.calculate_discount(
-                    deal.get('original_price'), current_price
-                )
+        # HTTP/2 lets same-retailer requests share one connection
+        async with httpx.AsyncClient(
+            http2=True,
+            headers=self.headers,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+            timeout=10.0,
+            follow_redirects=True
+        ) as session:
+            results = await asyncio.gather(
+                *[self._refresh_one(session, host_semaphores, deal, force) for deal in deals_to_refresh]
+            )
+        
+        # Apply updates in one pass once every fetch has settled
+        with self._lock:
+            for deal, (current_price, is_available, page_fields) in zip(deals_to_refresh, results):
+                if self._by_id.get(deal['id']) is not deal:
+                    continue  # Removed while its page was being fetched
+                old_price = deal['current_price']
+                deal['last_checked'] = datetime.now().isoformat()
+                deal['last_checked_ts'] = time.time()
+                deal.update(page_fields)
+                # Sort keys are about to change, so take the deal out of the indices first
+                self._unindex(deal)
                 
-                if current_price != old_price:
-                    price_change = current_price - old_price
-                    refresh_results[deal['id']] = f"Price changed: €{old_price} → €{current_price} ({price_change:+.2f})"
+                if current_price is not None:
+                    deal['current_price'] = current_price
+                    deal['discount_percentage'] = self.calculate_discount(
+                        deal.get('original_price'), current_price
+                    )
+                    
+                    if current_price != old_price:
+                        price_change = current_price - old_price
+                        refresh_results[deal['id']] = f"Price changed: €{old_price} → €{current_price} ({price_change:+.2f})"
+                    else:
+                        refresh_results[deal['id']] = "Price unchanged"
                 else:
-                    refresh_results[deal['id']] = "Price unchanged"
-            else:
-                refresh_results[deal['id']] = "Could not fetch price"
-            
-            # Update availability
-            if not is_available:
-                deal['status'] = 'out_of_stock'
-                refresh_results[deal['id']] += " - OUT OF STOCK"
-            else:
-                deal['status'] = 'active'
+                    refresh_results[deal['id']] = "Could not fetch price"
+                
+                # Update availability
+                if not is_available:
+                    deal['status'] = 'out_of_stock'
+                    refresh_results[deal['id']] += " - OUT OF STOCK"
+                else:
+                    deal['status'] = 'active'
+                
+                self._index(deal)
             
-            time.sleep(1)  # Be respectful with requests
-        
-        self.save_deals()
+            self.save_deals([d for d in deals_to_refresh if d['id'] in refresh_results])
+            self.version += 1
         return refresh_results
     
     def get_active_deals(self, sort_by: str = 'discount_percentage') -> List[Dict]:
         """Get all active deals sorted by specified criteria"""
-        active_deals = [d for d in self.deals if d.get('status') == 'active']
-        
-        if sort_by == 'discount_percentage':
-            return sorted(active_deals, 
-                         key=lambda x: x.get('discount_percentage', 0), 
-                         reverse=True)
-        elif sort_by == 'added_date':
-            return sorted(active_deals, 
-                         key=lambda x: x.get('added_date', ''), 
-                         reverse=True)
-        elif sort_by == 'price':
-            return sorted(active_deals, 
-                         key=lambda x: x.get('current_price', 0))
-        
-        return active_deals
+        with self._lock:
+            index = self._sorted_indices.get(sort_by)
+            if index is None:
+                return [d for d in self.deals if d.get('status') == 'active']
+            
+            ordered = reversed(index) if _SORT_INDICES[sort_by][1] else index
+            return [d for d in ordered if d.get('status') == 'active']
     
     def get_stale_deals(self, hours: int = 24) -> List[Dict]:
         """Get deals that haven't been checked recently"""
-        cutoff = datetime.now() - timedelta(hours=hours)
-        
-        stale_deals = []
-        for deal in self.deals:
-            try:
-                last_checked = datetime.fromisoformat(deal['last_checked'])
-                if last_checked < cutoff:
-                    stale_deals.append(deal)
-            except:
-                stale_deals.append(deal)  # If no last_checked, consider stale
-        
-        return stale_deals
-    
-    def remove_deal(self, deal_id: str):
-        """Remove a deal by ID"""
-        self.deals = [d for d in self.deals if d['id'] != deal_id]
-        self.save_deals()
+        cutoff = time.time() - hours * 3600
+        with self._lock:
+            return [d for d in self.deals if d.get('last_checked_ts', 0) < cutoff]
+    
+    def remove_deal(self, deal_id: str, flush: bool = True):
+        """Remove a deal by ID; with flush=False the delete waits for flush()"""
+        with self._lock:
+            deal = self._by_id.pop(deal_id, None)
+            if deal is None:
+                return
+            self.deals.remove(deal)
+            self._unindex(deal)
+            if self._unsaved:
+                self._unsaved = [d for d in self._unsaved if d is not deal]
+            self._unsaved_removals.append(deal_id)
+            if flush:
+                self.flush()
+            self.version += 1
 
 # Streamlit Interface for Deal Management
+@st.cache_resource
+def get_deal_manager() -> DealManager:
+    """Shared DealManager that survives Streamlit reruns.
+    
+    Mutating methods update the cached instance in place, so no invalidation
+    is needed after adding, removing or refreshing deals.
+    """
+    return DealManager()
+
+# Columns the analytics need, with their dtypes
+_ANALYTICS_COLUMNS = {
+    'id': 'string',
+    'retailer': 'string',
+    'current_price': 'float64',
+    'original_price': 'float64',
+    'discount_percentage': 'float64',
+}
+
+@st.cache_data(ttl=60)
+def load_active_deals_frame(_deal_manager: DealManager, version: int) -> pd.DataFrame:
+    """Active deals as a typed DataFrame, rebuilt only when the catalog version changes"""
+    df = pd.DataFrame.from_records(_deal_manager.get_active_deals(), columns=list(_ANALYTICS_COLUMNS))
+    return df.astype(_ANALYTICS_COLUMNS)
+
+@st.cache_data(ttl=60)
+def load_deal_analytics(_deal_manager: DealManager, version: int) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Overall KPIs and a per-retailer breakdown of active deals.
+    
+    Both tables are empty when there are no active deals.
+    """
+    df = load_active_deals_frame(_deal_manager, version)
+    if df.empty:
+        return pd.DataFrame(), pd.DataFrame()
+    
+    original = df['original_price'].fillna(df['current_price'])
+    df = df.assign(
+        discount_percentage=df['discount_percentage'].fillna(0),
+        savings=(original - df['current_price']).clip(lower=0)
+    )
+    
+    summary = df[['discount_percentage', 'savings', 'current_price']].agg(['mean', 'sum', 'count'])
+    by_retailer = df.groupby('retailer').agg(
+        count=('id', 'size'),
+        avg_discount=('discount_percentage', 'mean'),
+        total_savings=('savings', 'sum')
+    )
+    return summary, by_retailer
+
 def deal_management_interface():
     """Streamlit interface for managing deals"""
     st.title("Fashion Deal Manager")
     
-    deal_manager = DealManager()
+    deal_manager = get_deal_manager()
     
     # Sidebar for actions
     st.sidebar.title("Actions")
@@ -277,14 +705,34 @@ def deal_management_interface():
                     
                     deal_id = deal_manager.add_manual_deal(deal_data)
                     st.success(f"Deal added with ID: {deal_id}")
-                    st.experimental_rerun()
+                    st.rerun()
                 else:
                     st.error("Please fill in all required fields (*)")
     
+    # Bulk import form
+    with st.sidebar.expander("Import Deals from JSON"):
+        with st.form("import_deals"):
+            deals_json = st.text_area("Deals (JSON list)")
+            
+            if st.form_submit_button("Import Deals"):
+                imported = 0
+                try:
+                    for deal_data in orjson.loads(deals_json):
+                        deal_manager.add_manual_deal(deal_data, flush=False)
+                        imported += 1
+                except (ValueError, TypeError) as e:
+                    st.error(f"Import stopped after {imported} deals: {str(e)}")
+                finally:
+                    deal_manager.flush()
+                
+                if imported:
+                    st.success(f"Imported {imported} deals")
+    
     # Refresh prices button
+    force_refresh = st.sidebar.checkbox("Ignore recently checked pages")
     if st.sidebar.button("Refresh All Prices"):
         with st.spinner("Refreshing prices..."):
-            results = deal_manager.refresh_deal_prices()
+            results = asyncio.run(deal_manager.refresh_deal_prices(force=force_refresh))
             st.sidebar.success(f"Refreshed {len(results)} deals")
             for deal_id, result in results.items():
                 st.sidebar.text(result)
@@ -311,59 +759,103 @@ def deal_management_interface():
         
         if min_discount > 0:
             active_deals = [d for d in active_deals 
-                           if d.get('discount_percentage', 0) >= min_discount]
+                           if (d.get('discount_percentage') or 0) >= min_discount]
         
         if retailer_filter:
             active_deals = [d for d in active_deals 
                            if d['retailer'] in retailer_filter]
         
-        # Display deals
-        for deal in active_deals:
-            with st.container():
-                col1, col2, col3, col4 = st.columns([2, 2, 1, 1])
-                
-                with col1:
-                    st.write(f"**{deal['product_name']}**")
-                    st.write(f"Brand: {deal['brand']}")
-                    st.write(f"Retailer: {deal['retailer']}")
-                
-                with col2:
-                    st.write(f"Price: €{deal['current_price']}")
-                    if deal.get('original_price'):
-                        st.write(f"Was: €{deal['original_price']}")
-                    if deal.get('discount_percentage'):
-                        st.write(f"**{deal['discount_percentage']}% OFF**")
-                
-                with col3:
-                    if st.button("View", key=f"view_{deal['id']}"):
-                        st.write(f"URL: {deal['product_url']}")
-                        if deal.get('affiliate_link'):
-                            st.write(f"Affiliate: {deal['affiliate_link']}")
-                
-                with col4:
-                    if st.button("Remove", key=f"remove_{deal['id']}"):
-                        deal_manager.remove_deal(deal['id'])
-                        st.experimental_rerun()
-                
-                st.divider()
+        # Display deals in a single grid; deleting rows removes the deals
+        columns = ['product_name', 'brand', 'retailer', 'current_price',
+                   'original_price', 'discount_percentage', 'product_url', 'affiliate_link']
+        df = pd.DataFrame(active_deals, columns=columns, index=[d['id'] for d in active_deals])
+        
+        edited = st.data_editor(
+            df,
+            column_config={
+                'product_name': "Product",
+                'brand': "Brand",
+                'retailer': "Retailer",
+                'current_price': st.column_config.NumberColumn("Price", format="€%.2f"),
+                'original_price': st.column_config.NumberColumn("Was", format="€%.2f"),
+                'discount_percentage': st.column_config.NumberColumn("Discount", format="%.1f%%"),
+                'product_url': st.column_config.LinkColumn("URL"),
+                'affiliate_link': st.column_config.LinkColumn("Affiliate"),
+            },
+            disabled=columns,
+            hide_index=True,
+            # 'dynamic' is the only mode that allows deleting rows; added rows are ignored
+            num_rows='dynamic',
+            # Editor state tracks deleted rows by position, so reset it whenever the catalog changes
+            key=f"active_deals_{deal_manager.version}"
+        )
+        
+        removed = df.index.difference(edited.index)
+        if len(edited.index) > len(df.index) - len(removed):
+            st.warning("Rows added here are not saved; use the Add New Deal form instead")
+        
+        if not removed.empty:
+            for deal_id in removed:
+                deal_manager.remove_deal(deal_id, flush=False)
+            deal_manager.flush()
+            st.rerun()
     
     with tab2:
         st.header("Deal Analytics")
         
-        active_deals = deal_manager.get_active_deals()
+        summary, by_retailer = load_deal_analytics(deal_manager, deal_manager.version)
         
-        if active_deals:
-            # Create dataframe for analysis
-            df = pd.DataFrame(active_deals)
-            
+        if not summary.empty:
             # Summary stats
             col1, col2, col3, col4 = st.columns(4)
             with col1:
-                st.metric("Total Active Deals", len(active_deals))
+                st.metric("Total Active Deals", int(summary.loc['count', 'current_price']))
             with col2:
-                avg_discount = df['discount_percentage'].fillna(0).mean()
+                avg_discount = summary.loc['mean', 'discount_percentage']
                 st.metric("Avg Discount %", f"{avg_discount:.1f}%")
             with col3:
-                total_savings = df.apply(lambda x: 
-                    (x.get('original_price', 0) - x['current_price']) 
-                    if x.get('original_price') else
+                total_savings = summary.loc['sum', 'savings']
+                st.metric("Total Savings", f"€{total_savings:.2f}")
+            with col4:
+                avg_price = summary.loc['mean', 'current_price']
+                st.metric("Avg Price", f"€{avg_price:.2f}")
+            
+            st.subheader("By Retailer")
+            st.dataframe(
+                by_retailer,
+                column_config={
+                    'count': "Deals",
+                    'avg_discount': st.column_config.NumberColumn("Avg Discount", format="%.1f%%"),
+                    'total_savings': st.column_config.NumberColumn("Total Savings", format="€%.2f"),
+                }
+            )
+    
+    with tab3:
+        st.header("Stale Deals")
+        
+        stale_hours = st.slider("Not checked in (hours)", 1, 168, 24)
+        stale_deals = deal_manager.get_stale_deals(stale_hours)
+        
+        if stale_deals:
+            st.dataframe(
+                pd.DataFrame(stale_deals, columns=['product_name', 'retailer', 'current_price', 'status', 'last_checked']),
+                column_config={
+                    'product_name': "Product",
+                    'retailer': "Retailer",
+                    'current_price': st.column_config.NumberColumn("Price", format="€%.2f"),
+                    'status': "Status",
+                    'last_checked': "Last Checked",
+                },
+                hide_index=True
+            )
+            
+            if st.button("Refresh Stale Deals"):
+                with st.spinner("Refreshing stale deals..."):
+                    results = asyncio.run(
+                        deal_manager.refresh_deal_prices([d['id'] for d in stale_deals])
+                    )
+                st.success(f"Refreshed {len(results)} deals")
+                for deal_id, result in results.items():
+                    st.text(result)
+        else:
+            st.info(f"Every deal was checked within the last {stale_hours} hours")